@@ -1,69 +1,21 @@
 # import libraries
 import json
+import os
+import sys
 import plotly
 import pandas as pd
-from sklearn.base import BaseEstimator,TransformerMixin
 from flask import Flask
 from flask import render_template, request, jsonify
 from plotly.graph_objs import Bar
-from sklearn.externals import joblib
+import joblib
 from sqlalchemy import create_engine
 
-# download library for all-nltk
-import nltk
-nltk.download('punkt')
-nltk.download('wordnet')
-nltk.download('averaged_perceptron_tagger')
-from nltk.stem import WordNetLemmatizer
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk import pos_tag, word_tokenize
+# import the text processing used to train the model, the pickled model refers to these definitions
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models'))
+from text_features import tokenize, StartingVerbExtractor, FastTfidfTransformer
 
 app = Flask(__name__)
 
-class StartingVerbExtractor(BaseEstimator, TransformerMixin):
-    """
-    Starting Verb Extractor class
-    
-    This class is used to extract the starting verb of each sentence, this will be used to create new features for the machine learning classifier.
-    """
-
-    def starting_verb(self, text):
-        sentence_list = nltk.sent_tokenize(text)
-        for sentence in sentence_list:
-            pos_tags = nltk.pos_tag(tokenize(sentence))
-            first_word, first_tag = pos_tags[0]
-            if first_tag in ['VB', 'VBP'] or first_word == 'RT':
-                return True
-        return False
-
-    # return the self from transformer
-    def fit(self, X, y = None):
-        return self
-
-    def transform(self, X):
-        X_tagged = pd.Series(X).apply(self.starting_verb)
-        return pd.DataFrame(X_tagged)
-    
-def tokenize(text):
-    """
-    Tokenize text messages function
-    
-    Arguments:
-        text: text message to be tokenized
-    Output:
-        clean_tokens: a list containing tokens extracted from text input
-    """
-
-    tokens = word_tokenize(text)
-    lemmatizer = WordNetLemmatizer()
-    
-    clean_tokens = []
-    for tok in tokens:
-        clean_tok = lemmatizer.lemmatize(tok).lower().strip()
-        clean_tokens.append(clean_tok)
-        
-    return clean_tokens
-
 # load data
 engine = create_engine('sqlite:///{}'.format('data/DisasterResponse.db'))
 df = pd.read_sql_table('DisasterResponse_table', engine)
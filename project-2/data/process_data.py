@@ -8,11 +8,12 @@ Sample Script Execution:
 Arguments:
     1) Path to messages csv file
     2) Path to categories csv file
-    3) Path to SQLite destination database (e.g. DisasterResponse.db)
+    3) Path to SQLite destination database (e.g. DisasterResponse.db), a Parquet copy (e.g. DisasterResponse.parquet) is saved next to it
 """
 
 # import libraries
 import sys
+import os
 import pandas as pd
 import numpy as np
 from sqlalchemy import create_engine
@@ -27,12 +28,15 @@ def load_data(messages_filepath, categories_filepath):
         return df
     """
     
-    # 1. load datasets
-    messages = pd.read_csv(messages_filepath)
-    categories = pd.read_csv(categories_filepath)
+    # 1. load datasets with the multi-threaded pyarrow parser into arrow-backed columns
+    messages = pd.read_csv(messages_filepath, engine='pyarrow', dtype_backend='pyarrow')
+    categories = pd.read_csv(categories_filepath, engine='pyarrow', dtype_backend='pyarrow')
     
-    # 2. merge datasets
-    df = pd.merge(messages, categories, how='left', on='id')
+    # 2. merge datasets, keeping one row per message id so the join stays one to one and no duplicates
+    # are left to remove, some ids appear with conflicting category rows and the first one is kept
+    messages = messages.loc[~messages.duplicated(subset=['id'], keep='first')]
+    categories = categories.loc[~categories.duplicated(subset=['id'], keep='first')]
+    df = messages.merge(categories, how='left', on='id')
     
     return df
     
@@ -47,46 +51,86 @@ def clean_data(df):
         return df
     """
     
-    # 3. split categories into separate category columns.
-    categories = df['categories'].str.split(';', expand=True)
-    row = categories.iloc[:1]
-    category_colnames = row.values.tolist()[0] 
-    category_colnames = [s.replace('-2', '').replace('-1', '').replace('-0', '') for s in category_colnames]
-    categories.columns = category_colnames
+    # 3. split the first row into category names, every row shares the same layout
+    categories = df['categories'].to_numpy()
+    fields = categories[0].split(';')
+    category_colnames = [field[:-2] for field in fields]
     
     # 4. convert category values to just numbers 0 or 1
-    for column in categories:
-        categories[column] = categories[column].str.strip().str[-1]
-        categories[column] = categories[column].astype(int)
-        
-    # 4.1 values other than 0 or 1 need to be corrected such as 2 to 1    
-    categories = categories.replace(to_replace=2, value=1)
+    # each "name-D" field ends with its digit, so the digit offsets of the first row apply to every row
+    row_length = len(categories[0])
+    all_digit_positions = np.cumsum([len(field) + 1 for field in fields]) - 2
+    
+    # 4.1 skip child_alone since it has only zeros
+    keep = [i for i, name in enumerate(category_colnames) if name != 'child_alone']
+    category_colnames = [category_colnames[i] for i in keep]
+    digit_positions = all_digit_positions[keep]
+    
+    # 4.2 check that every row really has the layout of the first row before slicing by offset
+    if df['categories'].str.len().nunique() != 1:
+        raise ValueError('categories rows have different lengths, expected every row to match the first row')
+    raw = np.frombuffer(''.join(categories).encode('ascii'), dtype=np.uint8)
+    raw = raw.reshape(len(categories), row_length)
+    names_mask = np.ones(row_length, dtype=bool)
+    names_mask[all_digit_positions] = False
+    if not (raw[:, names_mask] == raw[0, names_mask]).all():
+        raise ValueError('categories rows have different category names or order, expected every row to match the first row')
+    
+    # gather the digits straight into one preallocated label matrix and convert them to numbers in place
+    labels = np.empty((len(categories), len(digit_positions)), dtype=np.uint8)
+    np.take(raw, digit_positions, axis=1, out=labels)
+    labels -= ord('0')
+    if (labels > 9).any():
+        raise ValueError('categories values must be single digits')
+    labels = labels.view(np.int8)
+    
+    # 4.3 values other than 0 or 1 need to be corrected such as 2 to 1
+    np.minimum(labels, 1, out=labels)
+    categories = pd.DataFrame(labels, columns=category_colnames, index=df.index)
 
     # 5. replace categories column in df with new category columns
     df = df.drop(columns='categories')
-    df1 = pd.concat([df, categories], axis=1, join='inner')
-    df = df1
+    df = pd.concat([df, categories], axis=1, join='inner')
+    
+    return df
 
-    # 5. remove duplicates
-    df = df.drop_duplicates()
+def parquet_filename(database_filename):
+    """
+    Parquet filename Function
     
-    # 6. remove child_alone since it has only zeros
-    df = df.drop(['child_alone'], axis=1)
+    Arguments:
+        database_filename -> filename of SQLLite database
+    Output:
+        return filename of the Parquet file saved next to the database
+    """
     
-    return df
+    return os.path.splitext(database_filename)[0] + '.parquet'
 
-def save_data(df, database_filename):
+def save_data(df, database_filename, sqlite=True):
     """
     Clean Data from csv Function
     
     Arguments:
         df -> dataframe containing disaster messages and categories
-        database_filename -> filename of SQLLite database
+        database_filename -> filename of SQLLite database, the Parquet file is saved next to it
+        sqlite -> also save the SQLite database, which is read by the web app
     """
     
+    # the Parquet file is the fast handoff to train_classifier.py
+    df.to_parquet(parquet_filename(database_filename), index=False, compression='zstd', row_group_size=8192)
+    
+    if not sqlite:
+        return
+    
     engine = create_engine('sqlite:///'+ database_filename)
     table_name = database_filename.replace('.db','') + '_table'
-    df.to_sql('DisasterResponse_table', engine, index=False, if_exists='replace')
+    
+    # the database is rebuilt from the csv files on every run, so skip the fsync and on-disk journal,
+    # the rows are inserted with the default executemany which is already a single prepared statement
+    with engine.begin() as conn:
+        conn.exec_driver_sql('PRAGMA synchronous=OFF')
+        conn.exec_driver_sql('PRAGMA journal_mode=MEMORY')
+        df.to_sql('DisasterResponse_table', conn, index=False, if_exists='replace')
 
 def main():
     """
@@ -95,7 +139,7 @@ def main():
     This function applies the ETL process to the data:
         1) Load data from csv files
         2) Clean data from csv files
-        3) Save data to SQLite database
+        3) Save data to SQLite database and Parquet file
     
     """
         
@@ -110,7 +154,8 @@ def main():
         print('Cleaning data...')
         df = clean_data(df)
         
-        print('Saving data...\n    DATABASE: {}'.format(database_filepath))
+        print('Saving data...\n    DATABASE: {}\n    PARQUET: {}'
+              .format(database_filepath, parquet_filename(database_filepath)))
         save_data(df, database_filepath)
         
         print('Cleaned data saved to database!')
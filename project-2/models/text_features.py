@@ -0,0 +1,157 @@
+"""
+Text Features
+
+This Python module holds the text processing used by the machine learning pipeline: the tokenizer, the starting verb
+feature and the tf-idf transformer. It is imported by both train_classifier.py and the web app, so the pickled model
+refers to these definitions and live queries are processed exactly like the training messages.
+"""
+
+# import ntlk modules
+import nltk
+
+def _ensure(package, path):
+    """
+    Download a NLTK package only if it cannot be found locally
+
+    Arguments:
+        package: name of the NLTK package
+        path: resource path of the package in the NLTK data directory
+    """
+    try:
+        nltk.data.find(path)
+    except LookupError:
+        nltk.download(package, quiet = True)
+
+_ensure('punkt', 'tokenizers/punkt')
+_ensure('wordnet', 'corpora/wordnet')
+_ensure('averaged_perceptron_tagger', 'taggers/averaged_perceptron_tagger')
+
+# import libraries
+import numpy as np
+import pandas as pd
+import re
+import functools
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+
+# import sklearn modules
+from sklearn.feature_extraction.text import TfidfTransformer
+from sklearn.base import BaseEstimator,TransformerMixin
+from sklearn.preprocessing import normalize
+from sklearn.utils import check_array
+from sklearn.utils.validation import check_is_fitted
+
+# regex used to replace each url with a placeholder string
+_URL_RE = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+
+# regex used to extract word tokens from lower-cased text
+_TOK_RE = re.compile(r"[a-z0-9']+")
+
+# lemmatizer shared by every call to tokenize, a cached WordNet lookup that keeps words it does not know unchanged
+lemmatize = functools.lru_cache(maxsize=1<<17)(nltk.WordNetLemmatizer().lemmatize)
+
+@functools.lru_cache(maxsize=1<<20)
+def tokenize(text, url_placeholder = "urlplaceholder"):
+    """
+    Tokenize text messages function
+
+    Results are cached per unique message so repeated fits during GridSearchCV only tokenize each message once,
+    the returned list is shared between calls and must not be modified.
+
+    Arguments:
+        text: text message to be tokenized
+    Output:
+        clean_tokens: a list containing tokens extracted from text input
+    """
+
+    # replace every url by the placeholder in a single pass
+    text = _URL_RE.sub(url_placeholder, text.lower())
+
+    # extract word tokens from text input and use lemmatization to obtain the root forms of inflected/derived words
+    clean_tokens = [lemmatize(w) for w in _TOK_RE.findall(text)]
+
+    return clean_tokens
+
+@functools.lru_cache(maxsize=1<<16)
+def starting_verb(text):
+    """
+    Starting verb function
+
+    Results are cached per unique message, the cache is bounded since the web app calls this for every query.
+
+    Arguments:
+        text: text message to be checked
+    Output:
+        True if any sentence of the message starts with a verb or with 'RT'
+    """
+    sentence_list = nltk.sent_tokenize(text)
+    for sentence in sentence_list:
+        pos_tags = nltk.pos_tag(tokenize(sentence))
+        if not pos_tags:
+            continue
+        first_word, first_tag = pos_tags[0]
+        if first_tag in ['VB', 'VBP'] or first_word == 'RT':
+            return True
+    return False
+
+class StartingVerbExtractor(BaseEstimator, TransformerMixin):
+    """
+    Starting Verb Extractor class
+
+    This class is used to extract the starting verb of each sentence, this will be used to create new features for the machine learning classifier.
+    
+    Arguments:
+        n_jobs: number of threads used to tag the messages, 1 runs sequentially
+    """
+
+    def __init__(self, n_jobs = 1):
+        self.n_jobs = n_jobs
+
+    def starting_verb(self, text):
+        return starting_verb(text)
+
+    # return the self from transformer
+    def fit(self, X, y = None):
+        return self
+
+    def transform(self, X):
+        # nltk.pos_tag holds the GIL and the grid search already runs in parallel processes, so only use
+        # threads when asked to
+        if self.n_jobs == 1:
+            X_tagged = [self.starting_verb(text) for text in X]
+        else:
+            X_tagged = Parallel(n_jobs = self.n_jobs, prefer = 'threads', batch_size = 256)(
+                delayed(self.starting_verb)(text) for text in X)
+        # float32 like the text features, so the FeatureUnion output is not upcast to float64
+        return pd.DataFrame(X_tagged).astype(np.float32)
+
+class FastTfidfTransformer(TfidfTransformer):
+    """
+    Fast Tfidf Transformer class
+
+    This class scales the term counts by their idf in place on the sparse data array, instead of multiplying them by a
+    sparse diagonal matrix, this avoids one full size float64 allocation on every transform.
+    """
+
+    def transform(self, X, copy = True):
+        check_is_fitted(self)
+        X = check_array(X, accept_sparse = 'csr', dtype = np.float32, copy = copy)
+        if not sp.issparse(X):
+            X = sp.csr_matrix(X)
+
+        # idf_ is indexed by column, so the input must have exactly the fitted number of features
+        if self.use_idf and X.shape[1] != len(self.idf_):
+            raise ValueError('X has {} features, but FastTfidfTransformer is expecting {} features as input.'
+                             .format(X.shape[1], len(self.idf_)))
+
+        if self.sublinear_tf:
+            np.log(X.data, out = X.data)
+            X.data += 1
+
+        if self.use_idf:
+            np.multiply(X.data, np.take(self.idf_, X.indices), out = X.data, casting = 'unsafe')
+
+        if self.norm:
+            X = normalize(X, norm = self.norm, copy = False)
+
+        return X
@@ -0,0 +1,59 @@
+"""
+Tests for the ETL pipeline in process_data.py
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+
+from process_data import clean_data
+
+
+def make_df(categories):
+    return pd.DataFrame({
+        'id': range(len(categories)),
+        'message': ['message {}'.format(i) for i in range(len(categories))],
+        'original': None,
+        'genre': 'direct',
+        'categories': categories,
+    })
+
+
+def split_categories(df):
+    """Category parsing with the original str.split implementation"""
+    categories = df['categories'].str.split(';', expand=True)
+    categories.columns = [s[:-2] for s in categories.iloc[0]]
+    for column in categories:
+        categories[column] = categories[column].str.strip().str[-1].astype(int)
+    categories = categories.replace(to_replace=2, value=1)
+    return categories.drop(columns='child_alone')
+
+
+def test_clean_data_matches_str_split_parsing():
+    df = make_df([
+        'related-1;request-0;child_alone-0;water-1',
+        'related-2;request-1;child_alone-0;water-0',
+        'related-0;request-0;child_alone-0;water-0',
+    ])
+    expected = split_categories(df)
+
+    result = clean_data(df)
+
+    assert list(result.columns) == ['id', 'message', 'original', 'genre'] + list(expected.columns)
+    assert (result[expected.columns].to_numpy() == expected.to_numpy()).all()
+
+
+def test_clean_data_rejects_rows_of_different_length():
+    df = make_df(['related-1;request-0', 'related-1;requests-0'])
+    with pytest.raises(ValueError):
+        clean_data(df)
+
+
+def test_clean_data_rejects_rows_with_different_names():
+    df = make_df(['related-1;request-0', 'request-1;related-0'])
+    with pytest.raises(ValueError):
+        clean_data(df)
@@ -0,0 +1,21 @@
+"""
+Tests for the text processing shared by train_classifier.py and the web app
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models'))
+
+from text_features import tokenize
+
+
+def test_tokenize_replaces_urls_and_lowercases():
+    tokens = tokenize('Need WATER see http://example.com/help now')
+    assert tokens == ['need', 'water', 'see', 'urlplaceholder', 'now']
+
+
+def test_tokenize_keeps_over_long_tokens():
+    # data/disaster_messages.csv contains a 160 character token
+    long_token = 'a' * 160
+    assert tokenize('help ' + long_token) == ['help', long_token]